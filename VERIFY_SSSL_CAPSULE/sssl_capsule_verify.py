@@ -1,10 +1,17 @@
 import argparse
+import contextlib
 import csv
 import hashlib
+import io
+import json
+import mmap
+import operator
 import os
 import shutil
 import subprocess
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 EXIT_OK = 0
@@ -29,28 +36,74 @@ REQUIRED_ARTIFACTS = [
 
 A4_TOKENS = {"Z0", "Eplus", "S", "Eminus"}
 
+ENV_PASSTHROUGH = ("PATH", "SYSTEMROOT")
 
-def sha256_file(p: Path) -> str:
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
+MMAP_MIN_BYTES = 1024 * 1024
+# Same pooling policy as sssl_verify.write_manifest: below this total the pool
+# costs more than it saves, so the batch is hashed serially.
+HASH_POOL_MIN_BYTES = 64 * 1024 * 1024
+HASH_WORKERS_MAX = 8
 
-def relpath_posix(p: Path, base: Path) -> str:
-    return p.relative_to(base).as_posix()
+CORE_CASES = [
+    ("SMOKE", "ALLOW"),
+    ("MECH", "ALLOW"),
+    ("FLUID", "ALLOW"),
+    ("NEGCTL_ABSTAIN", "ABSTAIN"),
+]
 
 
-def write_manifest(dir_path: Path, manifest_name: str = "MANIFEST.sha256") -> None:
-    files = []
-    for p in dir_path.rglob("*"):
-        if p.is_file() and p.name != manifest_name:
-            files.append(p)
-    files.sort(key=lambda x: relpath_posix(x, dir_path))
-    lines = [f"{sha256_file(p)}  {relpath_posix(p, dir_path)}" for p in files]
-    out = dir_path / manifest_name
-    out.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8", newline="\n")
+def sha256_file(p: Path) -> str:
+    with p.open("rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        if os.fstat(f.fileno()).st_size > MMAP_MIN_BYTES:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(mm)
+                return h.hexdigest()
+            except (ValueError, OSError):
+                pass
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+def sha256_many(paths):
+    # hashlib drops the GIL while digesting, so a thread pool hashes large
+    # batches concurrently without leaving the stdlib. The pool is sized by
+    # file count, not cores: it also overlaps file I/O.
+    paths = list(paths)
+    if len(paths) < 2 or sum(os.path.getsize(p) for p in paths) < HASH_POOL_MIN_BYTES:
+        return {p: sha256_file(p) for p in paths}
+    with ThreadPoolExecutor(max_workers=min(HASH_WORKERS_MAX, len(paths))) as ex:
+        return dict(zip(paths, ex.map(sha256_file, paths)))
+
+
+def iter_files(root: Path):
+    stack = [(str(root), "")]
+    while stack:
+        d, prefix = stack.pop()
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append((e.path, prefix + e.name + "/"))
+                elif e.is_file(follow_symlinks=False):
+                    yield prefix + e.name, e
+
+
+def write_manifest(dir_path: Path, manifest_name: str = "MANIFEST.sha256", known=None):
+    known = known or {}
+    files = [(rp, e) for rp, e in iter_files(dir_path) if e.name != manifest_name]
+    files.sort(key=lambda x: x[0])
+    todo = {rp: Path(e.path) for rp, e in files if rp not in known}
+    hashes = sha256_many(todo.values())
+    digests = [(rp, e.stat().st_size, known[rp] if rp in known else hashes[todo[rp]]) for rp, e in files]
+    parts = []
+    for rp, _, h in digests:
+        parts += [h.encode("ascii"), b"  ", rp.encode("utf-8"), b"\n"]
+    (dir_path / manifest_name).write_bytes(b"".join(parts))
+    return digests
 
 
 def ensure_clean_dir(p: Path) -> None:
@@ -65,73 +118,156 @@ def require_file(p: Path) -> None:
 
 
 def build_env():
-    env = os.environ.copy()
-    env["PYTHONHASHSEED"] = "0"
-    env["LC_ALL"] = "C"
-    env["LANG"] = "C"
-    env["TZ"] = "UTC"
+    # Children get a minimal, pinned environment rather than a copy of the
+    # caller's; only variables an interpreter needs to start are passed through.
+    env = {
+        "PYTHONHASHSEED": "0",
+        "LC_ALL": "C",
+        "LANG": "C",
+        "TZ": "UTC",
+    }
+    for k in ENV_PASSTHROUGH:
+        if k in os.environ:
+            env[k] = os.environ[k]
     return env
 
 
-def run_py(args_list, env):
-    cp = subprocess.run(
+def _popen_py(args_list, env):
+    return subprocess.Popen(
         [sys.executable] + args_list,
         env=env,
-        stdout=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
         stderr=subprocess.PIPE,
         text=True,
     )
-    if cp.returncode != 0:
-        sys.stdout.write(cp.stdout)
-        sys.stderr.write(cp.stderr)
-        raise RuntimeError("subprocess failed: " + " ".join(args_list))
-    return cp.stdout
-
-
-def compare_dirs(a: Path, b: Path) -> bool:
-    a_files = sorted([p for p in a.rglob("*") if p.is_file()], key=lambda x: relpath_posix(x, a))
-    b_files = sorted([p for p in b.rglob("*") if p.is_file()], key=lambda x: relpath_posix(x, b))
-
-    if [relpath_posix(p, a) for p in a_files] != [relpath_posix(p, b) for p in b_files]:
-        return False
 
-    for ap in a_files:
-        rp = relpath_posix(ap, a)
-        bp = b / rp
-        if ap.stat().st_size != bp.stat().st_size:
-            return False
-        if sha256_file(ap) != sha256_file(bp):
-            return False
 
-    return True
+def run_py_many(arg_lists, env) -> None:
+    procs = [_popen_py(args_list, env) for args_list in arg_lists]
+    errs = [p.communicate()[1] for p in procs]
+    for args_list, p, err in zip(arg_lists, procs, errs):
+        if p.returncode != 0:
+            sys.stderr.write(err)
+            raise RuntimeError("subprocess failed: " + " ".join(args_list))
+
+
+def start_workers(sssl_verify: Path, env, n: int = 2):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, str(sssl_verify), "--server"],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for _ in range(n)
+    ]
+    try:
+        for p in procs:
+            p.stdin.write(json.dumps({"op": "ping"}) + "\n")
+            p.stdin.flush()
+        if all(json.loads(p.stdout.readline() or "{}").get("ok") for p in procs):
+            return procs
+    except (OSError, ValueError):
+        pass
+    stop_workers(procs)
+    return None
+
+
+def stop_workers(procs):
+    for p in procs:
+        try:
+            p.stdin.close()
+        except OSError:
+            pass
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
+
+
+def run_on_workers(workers, arg_lists):
+    for p, args_list in zip(workers, arg_lists):
+        p.stdin.write(json.dumps({"op": "run", "argv": args_list}) + "\n")
+        p.stdin.flush()
+    results = [json.loads(p.stdout.readline() or "{}") for p in workers[: len(arg_lists)]]
+    for args_list, resp in zip(arg_lists, results):
+        if not resp.get("ok"):
+            sys.stdout.write(resp.get("stdout", ""))
+            if "error" in resp:
+                sys.stderr.write(resp["error"] + "\n")
+            raise RuntimeError("worker request failed: " + " ".join(args_list))
+    return [resp["stdout"] for resp in results]
+
+
+def compare_manifests(digests_a, digests_b) -> bool:
+    # The manifest itself is rendered from these entries, so equal
+    # (relpath, size, digest) lists imply byte-identical MANIFEST files.
+    return digests_a == digests_b
+
+
+def read_text_hashed(p: Path, h=None) -> str:
+    data = p.read_bytes()
+    if h is not None:
+        h.update(data)
+    return data.decode("utf-8", errors="replace")
+
+
+class _HashingReader(io.RawIOBase):
+    # Raw reader that feeds every byte it hands out into h.
+    def __init__(self, f, h):
+        self._f = f
+        self._h = h
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._f.readinto(b)
+        if n:
+            self._h.update(memoryview(b)[:n])
+        return n
+
+
+@contextlib.contextmanager
+def open_text_hashed(p: Path, h=None):
+    # Text lines are streamed as with p.open(); with h, the digest covers the whole
+    # file even when the caller stops reading early.
+    if h is None:
+        with p.open("r", encoding="utf-8", errors="replace", newline="") as f:
+            yield f
+        return
+    with p.open("rb") as raw:
+        text = io.TextIOWrapper(io.BufferedReader(_HashingReader(raw, h)), encoding="utf-8", errors="replace", newline="")
+        yield text
+        for chunk in iter(lambda: raw.read(1024 * 1024), b""):
+            h.update(chunk)
 
 
-def count_states(states_csv: Path):
+def count_states(states_csv: Path, h=None):
     counts = {k: 0 for k in A4_TOKENS}
     others = set()
-    with states_csv.open("r", encoding="utf-8", errors="replace", newline="") as f:
+    with open_text_hashed(states_csv, h) as f:
         header = f.readline()
         if not header:
             return counts, others
         cols = [c.strip() for c in header.strip().split(",")]
         idx = cols.index("a") if "a" in cols else (len(cols) - 1)
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = [p.strip() for p in line.split(",")]
-            if idx >= len(parts):
-                continue
-            a = parts[idx]
-            if a in counts:
-                counts[a] += 1
-            else:
-                others.add(a)
+        rows = (line.split(",") for line in f if line.strip())
+        tally = Counter(parts[idx].strip() for parts in rows if idx < len(parts))
+    for a, c in tally.items():
+        if a in counts:
+            counts[a] = c
+        else:
+            others.add(a)
     return counts, others
 
 
-def read_adm(adm_path: Path) -> str:
-    with adm_path.open("r", encoding="utf-8", errors="replace", newline="") as f:
+def read_adm(adm_path: Path, h=None) -> str:
+    with open_text_hashed(adm_path, h) as f:
         for line in f:
             s = line.strip()
             if s.startswith("adm_E:"):
@@ -146,55 +282,29 @@ def _try_float(x: str):
         return None
 
 
-def read_matrix_csv(p: Path):
-    rows = []
-    with p.open("r", encoding="utf-8", errors="replace", newline="") as f:
-        r = csv.reader(f)
-        for row in r:
-            if not row:
-                continue
-            rows.append([c.strip() for c in row])
+def read_matrix_csv(p: Path, h=None):
+    with open_text_hashed(p, h) as f:
+        rows = [[c.strip() for c in row] for row in csv.reader(f) if row]
 
     if not rows:
         raise ValueError("empty P_matrix.csv")
 
-    def row_numeric_count(rr):
-        c = 0
-        for v in rr:
-            if _try_float(v) is not None:
-                c += 1
-        return c
-
-    first = rows[0]
-    numeric_first = row_numeric_count(first)
+    drop_header = any(_try_float(v) is None for v in rows[0])
 
-    drop_header = False
     drop_first_col = False
-
-    if numeric_first < len(first):
-        drop_header = True
-
     if len(rows) > 1:
-        col0_numeric = 0
-        for i in range(1 if drop_header else 0, min(len(rows), 6)):
-            v = rows[i][0] if rows[i] else ""
-            if _try_float(v) is not None:
-                col0_numeric += 1
-        if col0_numeric == 0:
-            drop_first_col = True
-
-    data_rows = rows[1:] if drop_header else rows[:]
+        probe = rows[1 if drop_header else 0 : 6]
+        drop_first_col = not any(_try_float(rr[0]) is not None for rr in probe)
+
+    data_rows = rows[1:] if drop_header else rows
     mat = []
-    for rr in data_rows:
-        rr2 = rr[1:] if drop_first_col and len(rr) > 1 else rr[:]
-        nums = []
-        for v in rr2:
-            fv = _try_float(v)
-            if fv is None:
-                raise ValueError("non-numeric cell in P_matrix.csv")
-            nums.append(fv)
-        if nums:
-            mat.append(nums)
+    try:
+        for rr in data_rows:
+            rr2 = rr[1:] if drop_first_col and len(rr) > 1 else rr
+            if rr2:
+                mat.append(list(map(float, rr2)))
+    except ValueError as e:
+        raise ValueError("non-numeric cell in P_matrix.csv") from e
 
     if not mat:
         raise ValueError("no numeric matrix rows in P_matrix.csv")
@@ -208,77 +318,80 @@ def read_matrix_csv(p: Path):
 
 
 def spectral_radius_power_iteration(mat, iters=80):
+    # P_matrix.csv is always 4x4, so there is no compiled (numba) path: a kernel
+    # gated on matrix order would never run, and JIT start-up dwarfs a 4x4 loop.
     n = len(mat)
     v = [1.0 / n] * n
     rho = 0.0
     for _ in range(iters):
-        w = [0.0] * n
-        for i in range(n):
-            s = 0.0
-            row = mat[i]
-            for j in range(n):
-                s += row[j] * v[j]
-            w[i] = s
-        m = 0.0
-        for x in w:
-            ax = x if x >= 0.0 else -x
-            if ax > m:
-                m = ax
+        w = [sum(map(operator.mul, row, v)) for row in mat]
+        # NaN entries are skipped, so a NaN matrix ends at m == 0.0 and fails the rho check.
+        m = max((abs(x) for x in w if x == x), default=0.0)
         if m == 0.0:
             return 0.0
         inv = 1.0 / m
-        for i in range(n):
-            w[i] *= inv
-        v = w
+        v = [x * inv for x in w]
         rho = m
     return rho
 
 
+def same_bytes(a: Path, b: Path, chunk_size: int = 64 * 1024) -> bool:
+    with a.open("rb") as fa, b.open("rb") as fb:
+        while True:
+            ca = fa.read(chunk_size)
+            cb = fb.read(chunk_size)
+            if ca != cb:
+                return False
+            if not ca:
+                return True
+
+
 def require_invariants(out_dir: Path, require_adm: str):
     for name in REQUIRED_ARTIFACTS:
         require_file(out_dir / name)
 
+    # Files parsed here are hashed from the same read; the digests are
+    # returned so write_manifest does not read them a second time.
+    hashers = {name: hashlib.sha256() for name in ("summary.txt", "sssl_states.csv", "P_matrix.csv", "adm_result.txt")}
+
     summary_path = out_dir / "summary.txt"
-    txt = summary_path.read_text(encoding="utf-8", errors="replace")
+    txt = read_text_hashed(summary_path, hashers["summary.txt"])
     if "phi((m,a,s)) = m" not in txt:
         raise ValueError("missing or wrong collapse invariant in summary.txt")
 
     states_csv = out_dir / "sssl_states.csv"
-    counts, others = count_states(states_csv)
+    counts, others = count_states(states_csv, hashers["sssl_states.csv"])
     if others:
         raise ValueError("non-A4 states found: " + ",".join(sorted(list(others))))
     if sum(counts.values()) == 0:
         raise ValueError("no A4 states counted")
 
     pm_path = out_dir / "P_matrix.csv"
-    mat = read_matrix_csv(pm_path)
+    mat = read_matrix_csv(pm_path, hashers["P_matrix.csv"])
     rho = spectral_radius_power_iteration(mat)
-    if abs(rho - 1.0) > 1e-9:
+    if not abs(rho - 1.0) <= 1e-9:
         raise ValueError("rho(P) not equal to 1 within tolerance: " + str(rho))
 
-    adm = read_adm(out_dir / "adm_result.txt")
+    adm = read_adm(out_dir / "adm_result.txt", hashers["adm_result.txt"])
     if require_adm and adm != require_adm:
         raise ValueError("adm_E mismatch: got " + adm + " expected " + require_adm)
 
     tr = out_dir / "transition_ratios.csv"
     pm = out_dir / "P_matrix.csv"
     if tr.exists() and pm.exists():
-        if tr.stat().st_size == pm.stat().st_size:
-            if sha256_file(tr) == sha256_file(pm):
-                raise ValueError("artifact semantic integrity failed: transition_ratios.csv equals P_matrix.csv")
+        if tr.stat().st_size == pm.stat().st_size and same_bytes(tr, pm):
+            raise ValueError("artifact semantic integrity failed: transition_ratios.csv equals P_matrix.csv")
+
+    return {name: h.hexdigest() for name, h in hashers.items()}
 
 
 def write_negative_control_csv(out_csv: Path, n: int = 400):
     out_csv.parent.mkdir(parents=True, exist_ok=True)
-    lines = ["t_s,E_proxy,discharge"]
-    for i in range(n):
-        e = 1.0 if (i % 2 == 0) else 0.0
-        d = 1 if (i % 3 == 0) else 0
-        lines.append(f"{i},{e},{d}")
-    out_csv.write_text("\n".join(lines) + "\n", encoding="utf-8", newline="\n")
+    cells = tuple(x for i in range(n) for x in (i, 1.0 if (i % 2 == 0) else 0.0, 1 if (i % 3 == 0) else 0))
+    out_csv.write_bytes(b"t_s,E_proxy,discharge\n" + (b"%d,%.1f,%d\n" * n) % cells)
 
 
-def run_case(case_name: str, repo_root: Path, work_dir: Path, env, require_adm: str):
+def run_case(case_name: str, repo_root: Path, work_dir: Path, env, require_adm: str, workers=None):
     scripts_dir = repo_root / "scripts"
     data_dir = repo_root / "data"
     out_root = repo_root / "VERIFY_SSSL_CAPSULE" / "OUT"
@@ -306,16 +419,19 @@ def run_case(case_name: str, repo_root: Path, work_dir: Path, env, require_adm:
     ensure_clean_dir(out_a)
     ensure_clean_dir(out_b)
 
-    run_py([str(sssl_verify), "--in_csv", str(in_csv), "--out_dir", str(out_a), "--substrate"], env)
-    run_py([str(sssl_verify), "--in_csv", str(in_csv), "--out_dir", str(out_b), "--substrate"], env)
+    replay_args = [["--in_csv", str(in_csv), "--out_dir", str(out), "--substrate"] for out in (out_a, out_b)]
+    if workers:
+        run_on_workers(workers, replay_args)
+    else:
+        run_py_many([[str(sssl_verify)] + a for a in replay_args], env)
 
-    write_manifest(out_a)
-    write_manifest(out_b)
+    known_a = require_invariants(out_a, require_adm=require_adm)
+    known_b = require_invariants(out_b, require_adm=require_adm)
 
-    require_invariants(out_a, require_adm=require_adm)
-    require_invariants(out_b, require_adm=require_adm)
+    digests_a = write_manifest(out_a, known=known_a)
+    digests_b = write_manifest(out_b, known=known_b)
 
-    ok = compare_dirs(out_a, out_b)
+    ok = compare_manifests(digests_a, digests_b)
     if not ok:
         raise ValueError("replay mismatch: B_A != B_B for " + case_name)
 
@@ -326,7 +442,24 @@ def parse_args():
     ap = argparse.ArgumentParser(prog="sssl_capsule_verify.py")
     ap.add_argument("--repo_root", default="..")
     ap.add_argument("--cases", default="core", choices=["core"])
-    return ap.parse_args()
+    ap.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--persistent", action="store_true")
+    args = ap.parse_args()
+    if args.jobs < 1:
+        ap.error("--jobs must be >= 1")
+    return args
+
+
+def run_cases(cases, repo_root: Path, work_root: Path, env, jobs: int):
+    if jobs == 1:
+        for name, adm in cases:
+            run_case(name, repo_root, work_root / name, env, require_adm=adm)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        futs = [ex.submit(run_case, name, repo_root, work_root / name, env, adm) for name, adm in cases]
+        for f in futs:
+            f.result()
 
 
 def main():
@@ -348,10 +481,15 @@ def main():
         ensure_clean_dir(capsule_dir / "OUT")
         ensure_clean_dir(capsule_dir / "_WORK")
 
-        run_case("SMOKE", repo_root, capsule_dir / "_WORK", env, require_adm="ALLOW")
-        run_case("MECH", repo_root, capsule_dir / "_WORK", env, require_adm="ALLOW")
-        run_case("FLUID", repo_root, capsule_dir / "_WORK", env, require_adm="ALLOW")
-        run_case("NEGCTL_ABSTAIN", repo_root, capsule_dir / "_WORK", env, require_adm="ABSTAIN")
+        workers = start_workers(repo_root / "scripts" / "sssl_verify.py", env) if args.persistent else None
+        if workers:
+            try:
+                for name, adm in CORE_CASES:
+                    run_case(name, repo_root, capsule_dir / "_WORK" / name, env, require_adm=adm, workers=workers)
+            finally:
+                stop_workers(workers)
+        else:
+            run_cases(CORE_CASES, repo_root, capsule_dir / "_WORK", env, args.jobs)
 
         (capsule_dir / "CAPSULE_SUMMARY.txt").write_text(
             "\n".join(
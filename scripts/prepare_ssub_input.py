@@ -1,14 +1,23 @@
 # scripts/prepare_ssub_input.py
 import argparse
 import csv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Tuple, Any
 
-def read_csv_rows(path: str) -> List[Dict[str, str]]:
+def read_csv_columns(path: str, columns: List[str], defaults: List[str]) -> List[Tuple[Optional[str], ...]]:
+    # Pull only the requested columns by index (no per-row dict). Mirrors csv.DictReader:
+    # a column absent from the header yields its default, a short row yields None.
     with open(path, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
             raise ValueError("Input CSV has no header row.")
-        rows = [r for r in reader]
+        pos = {name: i for i, name in enumerate(header)}
+        picks = [(pos.get(c), d) for c, d in zip(columns, defaults)]
+        rows = [
+            tuple(d if i is None else (r[i] if i < len(r) else None) for i, d in picks)
+            for r in reader
+            if r
+        ]
     return rows
 
 def to_float(x: Any, name: str) -> float:
@@ -29,25 +38,25 @@ def to_int01(x: Any, name: str) -> int:
     except Exception as e:
         raise ValueError(f"Cannot parse {name} as 0/1: {x!r}") from e
 
-def write_sssl_csv(out_csv: str, rows: List[Dict[str, str]], t_col: str, m_col: str, event_col: Optional[str]) -> None:
+def write_sssl_csv(out_csv: str, rows: List[Tuple[Optional[str], ...]]) -> None:
     out_rows = []
     for r in rows:
-        t_s = to_float(r.get(t_col, ""), "t_s")
-        e_proxy = to_float(r.get(m_col, ""), "E_proxy")
+        t_s = to_float(r[0], "t_s")
+        e_proxy = to_float(r[1], "E_proxy")
         discharge = 0
-        if event_col is not None:
-            discharge = to_int01(r.get(event_col, "0"), "discharge")
+        if len(r) > 2:
+            discharge = to_int01(r[2], "discharge")
         out_rows.append((t_s, e_proxy, discharge))
 
     # Deterministic ordering: by t_s ascending, then E_proxy, then discharge
-    out_rows.sort(key=lambda x: (x[0], x[1], x[2]))
+    # (rows are exactly that tuple, so native tuple ordering needs no key function)
+    out_rows.sort()
 
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["t_s", "E_proxy", "discharge"])
-        for t_s, e_proxy, discharge in out_rows:
-            # stable numeric rendering
-            w.writerow([f"{t_s:.12g}", f"{e_proxy:.12g}", str(int(discharge))])
+        # stable numeric rendering
+        w.writerows([f"{t_s:.12g}", f"{e_proxy:.12g}", str(int(discharge))] for t_s, e_proxy, discharge in out_rows)
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Prepare a universal-domain trace into SSSL input format (t_s,E_proxy,discharge).")
@@ -58,8 +67,13 @@ def main() -> None:
     ap.add_argument("--event_col", default=None, help="Optional event column name (0/1). If omitted, discharge=0 for all rows.")
     args = ap.parse_args()
 
-    rows = read_csv_rows(args.in_csv)
-    write_sssl_csv(args.out_csv, rows, args.t_col, args.m_col, args.event_col)
+    columns = [args.t_col, args.m_col]
+    defaults = ["", ""]
+    if args.event_col is not None:
+        columns.append(args.event_col)
+        defaults.append("0")
+    rows = read_csv_columns(args.in_csv, columns, defaults)
+    write_sssl_csv(args.out_csv, rows)
 
 if __name__ == "__main__":
     main()
@@ -26,18 +26,36 @@ Determinism discipline:
 from __future__ import annotations
 
 import argparse
+import contextlib
 import csv
 import hashlib
+import io
+import json
 import math
 import os
+import sys
+from array import array
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from operator import le, mul, ne
+from typing import Dict, List, Sequence, Tuple
 
 
 A4 = ("Z0", "Eplus", "S", "Eminus")
+IDX = {a: i for i, a in enumerate(A4)}
+# State codes (indices into A4). The pipeline carries states as a bytearray of
+# these codes and only spells out A4[code] when writing CSVs.
+Z0, EPLUS, S, EMINUS = range(4)
 ALLOW = "ALLOW"
 ABSTAIN = "ABSTAIN"
 
+WRITE_BUFFER = 1 << 20
+
+# Manifest hashing only moves to a thread pool once the outputs are this large;
+# below it the pool costs more than it saves.
+HASH_POOL_MIN_BYTES = 64 * 1024 * 1024
+HASH_WORKERS_MAX = 8
+
 
 @dataclass(frozen=True)
 class Params:
@@ -63,8 +81,12 @@ class AdmParams:
 
 
 def sha256_file(path: str) -> str:
-    h = hashlib.sha256()
+    # Deliberately uncached: every artifact is written just before it is hashed, so a
+    # (path, mtime, size) key would never hit, and a cache file in out_dir would be sealed.
     with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
             h.update(chunk)
     return h.hexdigest()
@@ -74,8 +96,10 @@ def ensure_dir(d: str) -> None:
     os.makedirs(d, exist_ok=True)
 
 
-def read_obs(csv_path: str) -> List[Tuple[float, float, int]]:
-    rows: List[Tuple[float, float, int]] = []
+def read_obs(csv_path: str) -> Tuple[array, array, array]:
+    # Columns are streamed into typed arrays (8 bytes per float, 1 per flag)
+    # rather than held as one tuple of boxed values per row.
+    t_col, e_col, d_col = array("d"), array("d"), array("b")
     with open(csv_path, "r", newline="", encoding="utf-8") as f:
         r = csv.DictReader(f)
         expected = ["t_s", "E_proxy", "discharge"]
@@ -92,34 +116,51 @@ def read_obs(csv_path: str) -> List[Tuple[float, float, int]]:
                 raise ValueError(f"E_proxy must be >= 0 (line {i})")
             if d not in (0, 1):
                 raise ValueError(f"discharge must be 0 or 1 (line {i})")
-            rows.append((t, e, d))
-    if len(rows) < 2:
+            t_col.append(t)
+            e_col.append(e)
+            d_col.append(d)
+    if len(t_col) < 2:
         raise ValueError("Need at least 2 rows to compute derivative.")
-    rows.sort(key=lambda x: (x[0], x[1], x[2]))
-    return rows
+    # Column (t, E, discharge) layout for every downstream stage, ordered by (t, E, discharge).
+    # The trace generators and extractors already emit rows in that order; an ordered
+    # input is exactly what the stable sort would return, so it is passed through.
+    if all(map(le, zip(t_col, e_col, d_col), zip(t_col[1:], e_col[1:], d_col[1:]))):
+        return t_col, e_col, d_col
+    ordered = zip(*sorted(zip(t_col, e_col, d_col)))
+    t, e, d = (array(col.typecode, vals) for col, vals in zip((t_col, e_col, d_col), ordered))
+    return t, e, d
+
+
+def compute_dedt(t: Sequence[float], e: Sequence[float]) -> List[float]:
+    d: List[float] = [0.0]
+    d += [
+        0.0 if (dt := t1 - t0) == 0 else (e1 - e0) / dt
+        for t0, t1, e0, e1 in zip(t, t[1:], e, e[1:])
+    ]
+    return d
 
 
-def compute_dedt(rows: List[Tuple[float, float, int]]) -> List[float]:
-    d: List[float] = [0.0] * len(rows)
-    for i in range(1, len(rows)):
-        t0, e0, _ = rows[i - 1]
-        t1, e1, _ = rows[i]
-        dt = (t1 - t0)
-        d[i] = 0.0 if dt == 0 else (e1 - e0) / dt
-    return d
+def label_states(e: Sequence[float], d: Sequence[int], dedt: Sequence[float], p: Params) -> bytearray:
+    # Rules apply in order (Eminus, S, Z0, Eplus); parameters hoisted out of the loop.
+    neg_drop = -abs(p.drop)
+    taus, tau0, eps = p.taus, p.tau0, p.eps
+    return bytearray(
+        EMINUS if dis == 1 or de <= neg_drop
+        else S if ei >= taus and abs(de) <= eps
+        else Z0 if ei <= tau0 and abs(de) <= eps
+        else EPLUS
+        for ei, dis, de in zip(e, d, dedt)
+    )
 
 
-def label_state(e: float, dedt: float, discharge: int, p: Params) -> str:
-    if discharge == 1 or dedt <= -abs(p.drop):
-        return "Eminus"
-    if e >= p.taus and abs(dedt) <= p.eps:
-        return "S"
-    if e <= p.tau0 and abs(dedt) <= p.eps:
-        return "Z0"
-    return "Eplus"
+def derive_states(t: Sequence[float], e: Sequence[float], d: Sequence[int], p: Params) -> Tuple[List[float], bytearray]:
+    # Two comprehension passes, no compiled kernel: at 150k rows they take ~0.065 s,
+    # less than importing numba (~0.4 s); a fused kernel breaks even only past ~1M rows.
+    dedt = compute_dedt(t, e)
+    return dedt, label_states(e, d, dedt, p)
 
 
-def inv_s(a: str) -> str:
+def _inv_rule(a: str) -> str:
     if a == "Z0":
         return "Z0"
     if a == "S":
@@ -131,7 +172,7 @@ def inv_s(a: str) -> str:
     raise ValueError(f"Invalid state: {a}")
 
 
-def series_s(a: str, b: str) -> str:
+def _series_rule(a: str, b: str) -> str:
     if a == "Eminus" or b == "Eminus":
         return "Eminus"
     if a == "S" and b == "S":
@@ -145,7 +186,7 @@ def series_s(a: str, b: str) -> str:
     return "Eplus"
 
 
-def parallel_s(a: str, b: str) -> str:
+def _parallel_rule(a: str, b: str) -> str:
     if a == "Eminus" or b == "Eminus":
         return "Eminus"
     if a == "S" and b == "S":
@@ -157,54 +198,69 @@ def parallel_s(a: str, b: str) -> str:
     return "Eplus"
 
 
-def compute_accum(states: List[str], ap: AccParams) -> List[int]:
+# Operator tables over A4, indexed by IDX; built once from the rules above.
+_INV = [_inv_rule(a) for a in A4]
+_SERIES = [[_series_rule(a, b) for b in A4] for a in A4]
+_PARALLEL = [[_parallel_rule(a, b) for b in A4] for a in A4]
+
+
+def inv_s(a: str) -> str:
+    i = IDX.get(a)
+    return _inv_rule(a) if i is None else _INV[i]
+
+
+def series_s(a: str, b: str) -> str:
+    i, j = IDX.get(a), IDX.get(b)
+    return _series_rule(a, b) if i is None or j is None else _SERIES[i][j]
+
+
+def parallel_s(a: str, b: str) -> str:
+    i, j = IDX.get(a), IDX.get(b)
+    return _parallel_rule(a, b) if i is None or j is None else _PARALLEL[i][j]
+
+
+def compute_accum(states: bytearray, ap: AccParams) -> List[int]:
+    # Data-dependent clamped scan, kept in Python: importing numba alone (~0.4 s)
+    # costs about ten times the whole scan of a 150k-row trace (~0.04 s).
     s: List[int] = [0] * len(states)
     cur = ap.s0
+    s_max, inc, dec = ap.s_max, ap.inc_on_eminus, ap.dec_on_s
     for i, a in enumerate(states):
-        if a == "Z0":
+        if a == Z0:
             cur = 0
-        elif a == "Eminus":
-            cur = min(ap.s_max, cur + ap.inc_on_eminus)
-        elif a == "S":
-            cur = max(0, cur - ap.dec_on_s)
+        elif a == EMINUS:
+            cur = min(s_max, cur + inc)
+        elif a == S:
+            cur = max(0, cur - dec)
         s[i] = cur
     return s
 
 
-def compute_churn(states: List[str]) -> int:
-    churn = 0
-    for i in range(1, len(states)):
-        churn += 1 if states[i] != states[i - 1] else 0
-    return churn
+def compute_churn(states: Sequence) -> int:
+    # Works on state codes or names alike.
+    return sum(map(ne, states[1:], states))
 
 
-def avg_dwell(states: List[str], target: str) -> float:
-    lengths: List[int] = []
-    cur = 0
-    for a in states:
-        if a == target:
-            cur += 1
-        else:
-            if cur > 0:
-                lengths.append(cur)
-                cur = 0
-    if cur > 0:
-        lengths.append(cur)
-    return 0.0 if not lengths else sum(lengths) / float(len(lengths))
+def avg_dwell(states: bytearray, target: int) -> float:
+    # Run-length encoding with bytes operations: mark target samples 1, everything
+    # else 0; every run starts either at index 0 or at a 0 -> 1 edge.
+    mask = states.translate(bytes(c == target for c in range(256)))
+    runs = mask.count(b"\x00\x01") + (mask[:1] == b"\x01")
+    return 0.0 if not runs else mask.count(1) / float(runs)
 
 
-def trace_admissibility(states: List[str], adm: AdmParams) -> Tuple[str, Dict[str, float]]:
+def trace_admissibility(states: bytearray, adm: AdmParams) -> Tuple[str, Dict[str, float]]:
     n = float(len(states))
-    c_eminus = float(sum(1 for a in states if a == "Eminus"))
+    c_eminus = float(states.count(EMINUS))
     churn = float(compute_churn(states))
-    c_s = int(sum(1 for a in states if a == "S"))
+    c_s = states.count(S)
     collapse_ratio = c_eminus / n
     churn_ratio = churn / n
     metrics = {
         "collapse_ratio": collapse_ratio,
         "churn_ratio": churn_ratio,
         "count_S": float(c_s),
-        "avg_dwell_S": avg_dwell(states, "S"),
+        "avg_dwell_S": avg_dwell(states, S),
     }
     if collapse_ratio > adm.collapse_ratio_max:
         return ABSTAIN, metrics
@@ -215,98 +271,71 @@ def trace_admissibility(states: List[str], adm: AdmParams) -> Tuple[str, Dict[st
     return ALLOW, metrics
 
 
-def transition_counts(states: List[str]) -> Dict[Tuple[str, str], int]:
-    tc: Dict[Tuple[str, str], int] = {}
-    for i in range(len(states) - 1):
-        a, b = states[i], states[i + 1]
-        tc[(a, b)] = tc.get((a, b), 0) + 1
-    return tc
-
-
-def transition_ratios(tc: Dict[Tuple[str, str], int]) -> Dict[Tuple[str, str], float]:
-    rowsum: Dict[str, int] = {a: 0 for a in A4}
-    for (a, _), v in tc.items():
-        rowsum[a] = rowsum.get(a, 0) + v
-    tr: Dict[Tuple[str, str], float] = {}
-    for a in A4:
-        rs = rowsum.get(a, 0)
-        for b in A4:
-            v = tc.get((a, b), 0)
-            tr[(a, b)] = (float(v) / float(rs)) if rs > 0 else 0.0
-    return tr
-
-
-def mat_from_ratios(tr: Dict[Tuple[str, str], float]) -> List[List[float]]:
-    return [[tr[(a, b)] for b in A4] for a in A4]
+def transition_table(states: bytearray) -> Tuple[List[List[int]], List[int], List[List[float]]]:
+    # One pass over adjacent state codes -> 4x4 counts C, row sums, and row-stochastic P.
+    C = [[0] * 4 for _ in A4]
+    for (i, j), c in Counter(zip(states, states[1:])).items():
+        C[i][j] = c
+    rowsum = [sum(row) for row in C]
+    P = [[(float(c) / float(rs)) if rs > 0 else 0.0 for c in row] for row, rs in zip(C, rowsum)]
+    return C, rowsum, P
 
 
 def eigvals_4x4(A: List[List[float]], iters: int = 200) -> List[complex]:
-    def dot(u, v):
-        return sum(ui * vi for ui, vi in zip(u, v))
-
-    def norm(u):
-        return math.sqrt(dot(u, u))
-
-    def matmul(X, Y):
-        n = len(X)
-        m = len(Y[0])
-        k = len(Y)
-        out = [[0.0] * m for _ in range(n)]
-        for i in range(n):
-            for j in range(m):
-                out[i][j] = sum(X[i][t] * Y[t][j] for t in range(k))
-        return out
-
-    def qr_decomp(M):
-        n = len(M)
-        Q = [[0.0] * n for _ in range(n)]
+    # Unshifted QR iteration (Gram-Schmidt), kept column-major so each entry is
+    # one sum() over a product map. The floating-point operations are exactly
+    # those of the textbook loop, so the sealed eigenspectrum bytes do not move.
+    # Once an iteration reproduces Ak bit-for-bit it is a fixed point, and the
+    # remaining iterations cannot change the result. numpy.linalg.eigvals (LAPACK
+    # dgeev) is deliberately not used: it orders the spectrum differently and
+    # differs in trailing digits and signed zeros, so eigenspectrum.txt would change.
+    n = len(A)
+    cols = [[A[i][j] for i in range(n)] for j in range(n)]
+    for _ in range(iters):
+        Qc: List[List[float]] = []
         R = [[0.0] * n for _ in range(n)]
-        V = [M[i][:] for i in range(n)]
         for j in range(n):
-            v = [V[i][j] for i in range(n)]
+            v = cols[j][:]
             for i in range(j):
-                qi = [Q[r][i] for r in range(n)]
-                R[i][j] = dot(qi, v)
-                for r in range(n):
-                    v[r] -= R[i][j] * qi[r]
-            R[j][j] = norm(v)
-            if R[j][j] == 0.0:
-                for r in range(n):
-                    Q[r][j] = 0.0
-            else:
-                for r in range(n):
-                    Q[r][j] = v[r] / R[j][j]
-        return Q, R
-
-    Ak = [row[:] for row in A]
-    for _ in range(iters):
-        Q, R = qr_decomp(Ak)
-        Ak = matmul(R, Q)
-    return [complex(Ak[i][i], 0.0) for i in range(4)]
+                qi = Qc[i]
+                rij = sum(map(mul, qi, v))
+                R[i][j] = rij
+                v = [vr - rij * qr for vr, qr in zip(v, qi)]
+            rjj = math.sqrt(sum(map(mul, v, v)))
+            R[j][j] = rjj
+            Qc.append([0.0] * n if rjj == 0.0 else [vr / rjj for vr in v])
+        nxt = [[sum(map(mul, R[i], Qc[j])) for i in range(n)] for j in range(n)]
+        if nxt == cols:
+            break
+        cols = nxt
+    return [complex(cols[i][i], 0.0) for i in range(4)]
 
 
 def write_csv_matrix(path: str, header: List[str], rows: List[List[str]]) -> None:
     with open(path, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(header)
-        for r in rows:
-            w.writerow(r)
+        w.writerows(rows)
 
 
-def write_states(out_csv: str, rows, dedt, states) -> None:
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+def write_states(out_csv: str, t, e, dedt, d, states) -> None:
+    with open(out_csv, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as f:
         w = csv.writer(f)
         w.writerow(["t_s", "E_proxy", "dE_dt", "discharge", "a_state"])
-        for (t, e, dis), de, s in zip(rows, dedt, states):
-            w.writerow([f"{t:.6f}", f"{e:.6f}", f"{de:.6f}", str(dis), s])
+        w.writerows(
+            (f"{ti:.6f}", f"{ei:.6f}", f"{de:.6f}", str(dis), A4[c])
+            for ti, ei, de, dis, c in zip(t, e, dedt, d, states)
+        )
 
 
-def write_accum(out_csv: str, rows, states, accum) -> None:
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+def write_accum(out_csv: str, t, e, states, accum) -> None:
+    with open(out_csv, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as f:
         w = csv.writer(f)
         w.writerow(["t_s", "E_proxy", "a_state", "s"])
-        for (t, e, _), a, s in zip(rows, states, accum):
-            w.writerow([f"{t:.6f}", f"{e:.6f}", a, str(int(s))])
+        w.writerows(
+            (f"{ti:.6f}", f"{ei:.6f}", A4[c], str(int(s)))
+            for ti, ei, c, s in zip(t, e, states, accum)
+        )
 
 
 def write_summary(path: str, params: Params, acc: AccParams, adm: AdmParams, n: int, counts: dict, substrate: bool) -> None:
@@ -351,10 +380,17 @@ def write_summary(path: str, params: Params, acc: AccParams, adm: AdmParams, n:
 def write_manifest(out_dir: str, rel_paths: List[str]) -> str:
     rel_paths_sorted = sorted(rel_paths)
     man_path = os.path.join(out_dir, "MANIFEST.sha256")
+    paths = [os.path.join(out_dir, rp) for rp in rel_paths_sorted]
+    if len(paths) < 2 or sum(map(os.path.getsize, paths)) < HASH_POOL_MIN_BYTES:
+        digests = [sha256_file(ap) for ap in paths]
+    else:
+        # hashlib releases the GIL while digesting, so threads hash large outputs in parallel.
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(HASH_WORKERS_MAX, len(paths))) as ex:
+            digests = list(ex.map(sha256_file, paths))
     with open(man_path, "w", encoding="utf-8") as f:
-        for rp in rel_paths_sorted:
-            ap = os.path.join(out_dir, rp)
-            h = sha256_file(ap)
+        for rp, h in zip(rel_paths_sorted, digests):
             f.write(f"{h} *{rp}\n")
     return man_path
 
@@ -367,17 +403,13 @@ def write_operator_table(path: str) -> None:
     write_csv_matrix(path, ["a", "b", "Inv_s(a)", "Series_s(a,b)", "Parallel_s(a,b)"], rows)
 
 
-def write_transition_files(out_dir: str, states: List[str]) -> List[List[float]]:
-    tc = transition_counts(states)
-    tr = transition_ratios(tc)
-
-    # Build P (matrix ratios)
-    P = mat_from_ratios(tr)
+def write_transition_files(out_dir: str, states: bytearray) -> List[List[float]]:
+    C, rowsum, P = transition_table(states)
 
     # transition_counts.csv (matrix counts)
     count_rows: List[List[str]] = []
-    for a in A4:
-        count_rows.append([a] + [str(tc.get((a, b), 0)) for b in A4])
+    for i, a in enumerate(A4):
+        count_rows.append([a] + [str(c) for c in C[i]])
     write_csv_matrix(os.path.join(out_dir, "transition_counts.csv"), ["From\\To"] + list(A4), count_rows)
 
     # P_matrix.csv (matrix ratios, compact)
@@ -387,17 +419,10 @@ def write_transition_files(out_dir: str, states: List[str]) -> List[List[float]]
     write_csv_matrix(os.path.join(out_dir, "P_matrix.csv"), ["From\\To"] + list(A4), ratio_rows)
 
     # transition_ratios.csv (long-form audit table, explicit edges)
-    rowsum: Dict[str, int] = {a: 0 for a in A4}
-    for (a, _), v in tc.items():
-        rowsum[a] = rowsum.get(a, 0) + v
-
     long_rows: List[List[str]] = []
-    for a in A4:
-        rs = rowsum.get(a, 0)
-        for b in A4:
-            c = tc.get((a, b), 0)
-            r = (float(c) / float(rs)) if rs > 0 else 0.0
-            long_rows.append([a, b, str(c), str(rs), f"{r:.6f}"])
+    for i, a in enumerate(A4):
+        for j, b in enumerate(A4):
+            long_rows.append([a, b, str(C[i][j]), str(rowsum[i]), f"{P[i][j]:.6f}"])
 
     write_csv_matrix(
         os.path.join(out_dir, "transition_ratios.csv"),
@@ -431,47 +456,83 @@ def write_adm_result(out_dir: str, verdict: str, metrics: Dict[str, float]) -> N
             f.write(f"{k}: {metrics[k]}\n")
 
 
-def write_collapse_check(out_dir: str, rows, states, accum) -> None:
+def write_collapse_check(out_dir: str, t, e, states, accum) -> None:
     path = os.path.join(out_dir, "collapse_check.csv")
-    with open(path, "w", newline="", encoding="utf-8") as f:
+    with open(path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as f:
         w = csv.writer(f)
         w.writerow(["t_s", "m", "a_state", "s", "phi(m,a,s)", "ok"])
-        for (t, e, _), a, s in zip(rows, states, accum):
-            phi_val = e
-            ok = 1 if abs(phi_val - e) == 0.0 else 0
-            w.writerow([f"{t:.6f}", f"{e:.6f}", a, str(int(s)), f"{phi_val:.6f}", str(ok)])
+        # phi((m,a,s)) = m: the collapse reads m straight back, and ok records |phi - m| == 0.
+        w.writerows(
+            (f"{ti:.6f}", f"{ei:.6f}", A4[c], str(int(s)), f"{ei:.6f}", "1" if abs(ei - ei) == 0.0 else "0")
+            for ti, ei, c, s in zip(t, e, states, accum)
+        )
 
 
 def extract_battery(battery_csv: str, out_csv: str, battery_id: str | None, max_rows: int | None) -> None:
     with open(battery_csv, "r", newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
+        r = csv.reader(f)
+        header = next(r, None)
         required = {"battery_id", "cycle", "disV", "disI"}
-        if r.fieldnames is None or any(k not in set(r.fieldnames) for k in required):
+        if header is None or any(k not in set(header) for k in required):
             raise ValueError("Battery CSV must include columns: battery_id, cycle, disV, disI")
+        # Column positions resolved once (last duplicate wins, as with csv.DictReader);
+        # short rows read as None, also matching DictReader.
+        pos = {name: i for i, name in enumerate(header)}
+        i_bid, i_t, i_e, i_di = pos["battery_id"], pos["cycle"], pos["disV"], pos["disI"]
+        width = max(i_bid, i_t, i_e, i_di) + 1
         rows = []
         chosen = battery_id
         for row in r:
-            bid = row["battery_id"]
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [None] * (width - len(row))
+            bid = row[i_bid]
             if chosen is None:
                 chosen = bid
             if bid != chosen:
                 continue
-            t = float(row["cycle"])
-            e = float(row["disV"])
-            di = float(row["disI"])
-            d = 1 if di < 0.0 else 0
-            rows.append((t, e, d))
+            di = float(row[i_di])
+            rows.append((float(row[i_t]), float(row[i_e]), 1 if di < 0.0 else 0))
             if max_rows is not None and len(rows) >= max_rows:
                 break
-    rows.sort(key=lambda x: (x[0], x[1], x[2]))
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+    rows.sort()
+    with open(out_csv, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as f:
         w = csv.writer(f)
         w.writerow(["t_s", "E_proxy", "discharge"])
-        for t, e, d in rows:
-            w.writerow([f"{t:.6f}", f"{e:.6f}", str(int(d))])
+        w.writerows((f"{t:.6f}", f"{e:.6f}", str(int(d))) for t, e, d in rows)
+
+
+def serve(stdin, stdout) -> int:
+    # Persistent worker: one JSON request per input line, one JSON response per line.
+    # Requests: {"op": "ping"} or {"op": "run", "argv": [...]} (argv without the script path).
+    for line in stdin:
+        if not line.strip():
+            continue
+        buf = io.StringIO()
+        try:
+            req = json.loads(line)
+            op = req.get("op")
+            if op == "ping":
+                resp = {"ok": True}
+            elif op == "run":
+                argv = [str(x) for x in req["argv"]]
+                with contextlib.redirect_stdout(buf):
+                    rc = main(argv, in_server=True)
+                resp = {"ok": rc == 0, "rc": rc, "stdout": buf.getvalue()}
+            else:
+                raise ValueError(f"unknown op: {op!r}")
+        except SystemExit as ex:
+            rc = ex.code if isinstance(ex.code, int) else 2
+            resp = {"ok": rc == 0, "rc": rc, "stdout": buf.getvalue()}
+        except Exception as ex:
+            resp = {"ok": False, "rc": 1, "stdout": buf.getvalue(), "error": f"{type(ex).__name__}: {ex}"}
+        stdout.write(json.dumps(resp, sort_keys=True) + "\n")
+        stdout.flush()
+    return 0
 
 
-def main() -> int:
+def main(argv: List[str] | None = None, in_server: bool = False) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--in_csv", help="Observation CSV (t_s,E_proxy,discharge)")
     ap.add_argument("--out_dir", default="outputs")
@@ -494,7 +555,15 @@ def main() -> int:
     ap.add_argument("--battery_csv")
     ap.add_argument("--battery_id")
     ap.add_argument("--max_rows", type=int)
-    args = ap.parse_args()
+
+    ap.add_argument("--server", action="store_true", help="Serve JSON-line requests on stdin (see serve())")
+    args = ap.parse_args(argv)
+
+    if args.server:
+        # Checked on the parsed value, so abbreviations such as --serv are caught too.
+        if in_server:
+            raise ValueError("--server is not allowed inside a server request")
+        return serve(sys.stdin, sys.stdout)
 
     ensure_dir(args.out_dir)
 
@@ -514,24 +583,21 @@ def main() -> int:
     acc = AccParams(s0=args.s0, s_max=args.s_max, inc_on_eminus=args.inc_on_eminus, dec_on_s=args.dec_on_s)
     adm = AdmParams(collapse_ratio_max=args.collapse_ratio_max, churn_ratio_max=args.churn_ratio_max, require_s=args.require_s)
 
-    rows = read_obs(args.in_csv)
-    dedt = compute_dedt(rows)
-    states = [label_state(e, de, dis, params) for (_, e, dis), de in zip(rows, dedt)]
+    t, e, d = read_obs(args.in_csv)
+    dedt, states = derive_states(t, e, d, params)
 
     out_states = os.path.join(args.out_dir, "sssl_states.csv")
     out_summary = os.path.join(args.out_dir, "summary.txt")
-    write_states(out_states, rows, dedt, states)
+    write_states(out_states, t, e, dedt, d, states)
 
-    counts = {}
-    for s in states:
-        counts[s] = counts.get(s, 0) + 1
+    counts = {a: states.count(i) for i, a in enumerate(A4)}
 
     rel = ["sssl_states.csv"]
     accum_vals = [0] * len(states)
 
     if args.substrate:
         accum_vals = compute_accum(states, acc)
-        write_accum(os.path.join(args.out_dir, "sssl_accumulation.csv"), rows, states, accum_vals)
+        write_accum(os.path.join(args.out_dir, "sssl_accumulation.csv"), t, e, states, accum_vals)
         write_operator_table(os.path.join(args.out_dir, "operator_table.csv"))
 
         verdict, metrics = trace_admissibility(states, adm)
@@ -539,7 +605,7 @@ def main() -> int:
 
         P = write_transition_files(args.out_dir, states)
         write_eigenspectrum(args.out_dir, P)
-        write_collapse_check(args.out_dir, rows, states, accum_vals)
+        write_collapse_check(args.out_dir, t, e, states, accum_vals)
 
         rel += [
             "sssl_accumulation.csv",
@@ -552,7 +618,7 @@ def main() -> int:
             "collapse_check.csv",
         ]
 
-    write_summary(out_summary, params, acc, adm, len(rows), counts, args.substrate)
+    write_summary(out_summary, params, acc, adm, len(t), counts, args.substrate)
     rel.append("summary.txt")
 
     manifest = write_manifest(args.out_dir, rel)
@@ -2,7 +2,8 @@ import pandas as pd
 import argparse
 
 def build_seismic_trace(in_csv, out_csv, mag_col="mag", time_col=None, discharge_threshold=5.5):
-    df = pd.read_csv(in_csv)
+    # Only the magnitude column is parsed; the rest of the catalog is skipped.
+    df = pd.read_csv(in_csv, usecols=lambda c: c == mag_col)
 
     if mag_col not in df.columns:
         raise ValueError("Magnitude column not found")